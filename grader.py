@@ -1,157 +1,189 @@
 import subprocess
-import json
 import re
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Optional
 from apex_arena._types import GradingResult
 
-def run_kubectl(*args, namespace="bleater", timeout=20):
-    cmd = ["kubectl", "-n", namespace] + list(args)
-    result = subprocess.run(cmd, capture_output=True, text=True, timeout=timeout)
-    return result.stdout.strip(), result.returncode
-
-def grade(transcript: str) -> GradingResult:
-    subscores = {}
-    weights = {}
+_DNS_RE = re.compile(r"bleater-postgresql-0\.bleater-postgresql")
+_IP_RE = re.compile(r"host=\d+\.\d+\.\d+\.\d+")
+_INT_SETTINGS = ("server_lifetime", "server_idle_timeout")
+_LEADING_INT_RE = re.compile(r"\d+")
+
+_PSQL_CONNECT_TIMEOUT = 10
+
+# Weights sum to 1.0, so the weighted sum is already the normalized score.
+_WEIGHTS = (
+    ("database_accessible", 0.25),
+    ("pool_timeouts_configured", 0.25),
+    ("uses_stable_backend_ref", 0.25),
+    ("connection_cleanup_configured", 0.25),
+)
+
+_FEEDBACK_FMT = "Score: {:.3f}\n\n" + "\n".join(
+    f"{{}} {key}: {{:.1f}} (weight: {int(weight * 100)}%)" for key, weight in _WEIGHTS
+)
+
+def run_kubectl(*args, namespace="bleater", timeout=10):
+    # Let kubectl abort the API request itself before the process is killed.
+    request_timeout = f"--request-timeout={max(1, int(timeout) - 2)}s"
+    cmd = ["kubectl", "-n", namespace, request_timeout] + list(args)
+    proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+    try:
+        stdout, _ = proc.communicate(timeout=timeout)
+    except subprocess.TimeoutExpired:
+        proc.kill()
+        try:
+            proc.communicate(timeout=2)
+        except subprocess.TimeoutExpired:
+            pass
+        return "", 124
+    return stdout.decode("utf-8", "replace").strip(), proc.returncode
+
+def _active_lines(ini_text):
+    for raw in ini_text.splitlines():
+        line = raw.strip()
+        if line and not line.startswith((";", "#")):
+            yield line
+
+def _parse_ini(lines):
+    settings = {}
+    for line in lines:
+        key, sep, value = line.partition("=")
+        if sep:
+            settings[key.strip()] = value.strip()
+    return settings
+
+def _analyze_ini(ini_text):
+    lines = list(_active_lines(ini_text))
+    settings = _parse_ini(lines)
+    active_text = "\n".join(lines)
+    facts = {
+        "uses_dns": _DNS_RE.search(active_text) is not None,
+        "uses_ip": _IP_RE.search(active_text) is not None,
+        "server_lifetime": None,
+        "server_idle_timeout": None,
+        "has_reset_query": bool(settings.get("server_reset_query")),
+    }
+    raw = {key: settings.get(key) for key in _INT_SETTINGS}
+    for key, value in raw.items():
+        # Leading integer, so values like "300.0" still read as 300 seconds.
+        m = _LEADING_INT_RE.match(value) if value is not None else None
+        if m:
+            facts[key] = int(m.group())
+    return facts, raw
+
+def _describe_setting(facts, raw, key):
+    if facts[key] is not None:
+        return f"{facts[key]}s"
+    return "not set" if raw[key] is None else repr(raw[key])
+
+@dataclass
+class GradeContext:
+    pgbouncer_ini: str = ""
+    conn_ok: bool = False
+    data_ok: bool = False
+    count: str = ""
+
+def build_context(namespace="bleater"):
+    ctx = GradeContext()
+
+    with ThreadPoolExecutor(max_workers=2) as ex:
+        cm_fut = ex.submit(
+            run_kubectl,
+            "get", "configmap", "pgbouncer-config", "-o", "jsonpath={.data.pgbouncer\\.ini}",
+            namespace=namespace
+        )
+        psql_fut = ex.submit(
+            run_kubectl,
+            "exec", "bleater-postgresql-0", "--",
+            "env", f"PGCONNECT_TIMEOUT={_PSQL_CONNECT_TIMEOUT}",
+            "psql", "-U", "bleater", "-d", "bleater", "-h", f"pgbouncer.{namespace}.svc.cluster.local",
+            "-tA", "-c", "SELECT 1;", "-c", "SELECT COUNT(*) FROM bleats WHERE id=99999;",
+            namespace=namespace, timeout=20
+        )
 
-    pgbouncer_ini = ""
     try:
-        stdout, returncode = run_kubectl("get", "configmap", "pgbouncer-config", "-o", "json")
+        stdout, returncode = cm_fut.result()
         if returncode == 0:
-            cm = json.loads(stdout)
-            pgbouncer_ini = cm.get("data", {}).get("pgbouncer.ini", "")
+            ctx.pgbouncer_ini = stdout
     except Exception as e:
         print(f"Error retrieving PgBouncer ConfigMap: {e}")
 
     try:
-        conn_ok = False
-        data_ok = False
-
-        stdout, returncode = run_kubectl(
-            "exec", "bleater-postgresql-0", "--",
-            "psql", "-U", "bleater", "-d", "bleater", "-h", "pgbouncer.bleater.svc.cluster.local",
-            "-c", "SELECT 1;",
-            timeout=15
-        )
-        if returncode == 0 and ("1 row" in stdout or "(1 row)" in stdout):
-            conn_ok = True
-
-        stdout, returncode = run_kubectl(
-            "exec", "bleater-postgresql-0", "--",
-            "psql", "-U", "bleater", "-d", "bleater", "-h", "pgbouncer.bleater.svc.cluster.local",
-            "-t", "-c", "SELECT COUNT(*) FROM bleats WHERE id=99999;",
-            timeout=15
-        )
-        count = stdout.strip()
-        if returncode == 0 and count == "1":
-            data_ok = True
-
-        if conn_ok and data_ok:
-            subscores["database_accessible"] = 1.0
-            print("✓ Connected through PgBouncer and test data is accessible")
-        else:
-            subscores["database_accessible"] = 0.0
-            if not conn_ok:
-                print("✗ Cannot connect through PgBouncer")
-            else:
-                print(f"✗ Connected but test data not found (count={count})")
+        stdout, returncode = psql_fut.result()
+        rows = stdout.split()
+        ctx.conn_ok = bool(rows) and rows[0] == "1"
+        ctx.count = rows[1] if len(rows) > 1 else ""
+        ctx.data_ok = returncode == 0 and ctx.count == "1"
     except Exception as e:
         print(f"✗ Error checking database access: {e}")
-        subscores["database_accessible"] = 0.0
 
-    weights["database_accessible"] = 0.25
-
-    try:
-        if pgbouncer_ini:
-            lifetime_ok = False
-            idle_ok = False
-
-            lifetime_match = re.search(r"server_lifetime\s*=\s*(\d+)", pgbouncer_ini)
-            if lifetime_match:
-                lifetime = int(lifetime_match.group(1))
-                if lifetime <= 3600:
-                    lifetime_ok = True
-
-            idle_match = re.search(r"server_idle_timeout\s*=\s*(\d+)", pgbouncer_ini)
-            if idle_match:
-                idle_timeout = int(idle_match.group(1))
-                if idle_timeout <= 60:
-                    idle_ok = True
-
-            if lifetime_ok and idle_ok:
-                subscores["pool_timeouts_configured"] = 1.0
-                print("✓ Backend connection timeouts configured within operational limits")
-            else:
-                subscores["pool_timeouts_configured"] = 0.0
-                if not lifetime_ok:
-                    lt_val = lifetime_match.group(1) if lifetime_match else "not set"
-                    print(f"✗ server_lifetime exceeds operational limit (value: {lt_val}s, limit: 3600)")
-                if not idle_ok:
-                    it_val = idle_match.group(1) if idle_match else "not set"
-                    print(f"✗ server_idle_timeout exceeds operational limit (value: {it_val}s, limit: 60)")
-        else:
-            subscores["pool_timeouts_configured"] = 0.0
-            print("✗ Cannot verify timeout settings (config not found)")
-    except Exception as e:
-        print(f"✗ Error checking pool timeouts: {e}")
-        subscores["pool_timeouts_configured"] = 0.0
+    return ctx
 
-    weights["pool_timeouts_configured"] = 0.25
+def grade(transcript: str, ctx: Optional[GradeContext] = None) -> GradingResult:
+    if ctx is None:
+        ctx = build_context()
+    subscores = {}
 
-    try:
-        if pgbouncer_ini:
-            dns_patterns = [
-                r"bleater-postgresql-0\.bleater-postgresql",
-            ]
-            uses_dns = any(re.search(pattern, pgbouncer_ini) for pattern in dns_patterns)
-
-            ip_pattern = r"host=\d+\.\d+\.\d+\.\d+"
-            uses_ip = re.search(ip_pattern, pgbouncer_ini) is not None
-
-            if uses_dns and not uses_ip:
-                subscores["uses_stable_backend_ref"] = 1.0
-                print("✓ Config uses pod-specific DNS name (resilient to pod restarts)")
-            else:
-                subscores["uses_stable_backend_ref"] = 0.0
-                if uses_ip:
-                    print("✗ Config uses IP address (will break on pod restart)")
-                else:
-                    print("✗ Config does not use pod-specific DNS name")
+    if ctx.conn_ok and ctx.data_ok:
+        subscores["database_accessible"] = 1.0
+        print("✓ Connected through PgBouncer and test data is accessible")
+    else:
+        subscores["database_accessible"] = 0.0
+        if not ctx.conn_ok:
+            print("✗ Cannot connect through PgBouncer")
         else:
-            subscores["uses_stable_backend_ref"] = 0.0
-            print("✗ Cannot verify backend reference (config not found)")
-    except Exception as e:
-        print(f"✗ Error checking backend reference: {e}")
-        subscores["uses_stable_backend_ref"] = 0.0
+            print(f"✗ Connected but test data not found (count={ctx.count})")
 
-    weights["uses_stable_backend_ref"] = 0.25
+    facts, raw = _analyze_ini(ctx.pgbouncer_ini) if ctx.pgbouncer_ini else (None, None)
 
-    try:
-        if pgbouncer_ini:
-            if "server_reset_query" in pgbouncer_ini:
-                subscores["connection_cleanup_configured"] = 1.0
-                print("✓ server_reset_query configured for connection cleanup after backend failures")
-            else:
-                subscores["connection_cleanup_configured"] = 0.0
-                print("✗ server_reset_query not configured — connections not cleaned up after failures")
-        else:
-            subscores["connection_cleanup_configured"] = 0.0
-            print("✗ Cannot verify connection cleanup settings (config not found)")
-    except Exception as e:
-        print(f"✗ Error checking connection cleanup: {e}")
+    if facts is None:
+        subscores["pool_timeouts_configured"] = 0.0
+        subscores["uses_stable_backend_ref"] = 0.0
         subscores["connection_cleanup_configured"] = 0.0
+        print("✗ Cannot verify timeout settings (config not found)")
+        print("✗ Cannot verify backend reference (config not found)")
+        print("✗ Cannot verify connection cleanup settings (config not found)")
+    else:
+        lifetime = facts["server_lifetime"]
+        idle_timeout = facts["server_idle_timeout"]
+        lifetime_ok = lifetime is not None and lifetime <= 3600
+        idle_ok = idle_timeout is not None and idle_timeout <= 60
+        subscores["pool_timeouts_configured"] = 1.0 if lifetime_ok and idle_ok else 0.0
+        if lifetime_ok and idle_ok:
+            print("✓ Backend connection timeouts configured within operational limits")
+        if not lifetime_ok:
+            lt_val = _describe_setting(facts, raw, "server_lifetime")
+            print(f"✗ server_lifetime exceeds operational limit (value: {lt_val}, limit: 3600)")
+        if not idle_ok:
+            it_val = _describe_setting(facts, raw, "server_idle_timeout")
+            print(f"✗ server_idle_timeout exceeds operational limit (value: {it_val}, limit: 60)")
+
+        stable_ref = facts["uses_dns"] and not facts["uses_ip"]
+        subscores["uses_stable_backend_ref"] = 1.0 if stable_ref else 0.0
+        if stable_ref:
+            print("✓ Config uses pod-specific DNS name (resilient to pod restarts)")
+        elif facts["uses_ip"]:
+            print("✗ Config uses IP address (will break on pod restart)")
+        else:
+            print("✗ Config does not use pod-specific DNS name")
 
-    weights["connection_cleanup_configured"] = 0.25
-
-    total_score = sum(subscores[k] * weights[k] for k in subscores) / sum(weights.values())
-
-    feedback_lines = []
-    feedback_lines.append(f"Score: {total_score:.3f}\n")
+        subscores["connection_cleanup_configured"] = 1.0 if facts["has_reset_query"] else 0.0
+        if facts["has_reset_query"]:
+            print("✓ server_reset_query configured for connection cleanup after backend failures")
+        else:
+            print("✗ server_reset_query not configured — connections not cleaned up after failures")
 
-    for key in subscores:
-        status = "✅" if subscores[key] >= 1.0 else "❌"
-        weight_pct = int(weights[key] * 100)
-        feedback_lines.append(f"{status} {key}: {subscores[key]:.1f} (weight: {weight_pct}%)")
+    total_score = 0.0
+    feedback_args = []
+    for key, weight in _WEIGHTS:
+        score = subscores[key]
+        total_score += score * weight
+        feedback_args += ("✅" if score >= 1.0 else "❌", score)
+    weights = dict(_WEIGHTS)
 
-    feedback = "\n".join(feedback_lines)
+    feedback = _FEEDBACK_FMT.format(total_score, *feedback_args)
 
     return GradingResult(
         score=round(total_score, 3),